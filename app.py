@@ -1,13 +1,28 @@
 import streamlit as st
 import fitz  # PyMuPDF
+import collections
+import functools
+import hashlib
+import numpy as np
 import re
 import json
+import orjson
 import os
+import queue
+import tempfile
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from google import genai
 from typing import Dict
-import tempfile
+
+# Numba is optional: when present, dense pages use a jitted line-break
+# kernel instead of the NumPy diff
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Page configuration
 st.set_page_config(
@@ -26,53 +41,190 @@ if 'results' not in st.session_state:
 MAX_RETRIES = 3
 RETRY_DELAY = 2
 
+# Bump whenever create_extraction_prompt changes so stale cached
+# responses are never reused against a newer prompt
+SCHEMA_VERSION = "2"
+
+# On-disk cache of validated Gemini responses, keyed by content hash
+_cache_dir = Path(tempfile.gettempdir()) / "pdf2json_cache"
+
+# Pre-compiled regexes for text cleanup (compiled once at import)
+_WS_RE = re.compile(r"[ \t]+")
+_NL_RE = re.compile(r"\n{3,}")
+
+# Placeholder values the model emits for missing fields
+_NULL_VALUES = frozenset({"none", "null", "n/a", "na", ""})
+
+# Only hand spans to the jitted kernel when there are enough of them to
+# amortize the call overhead
+_NUMBA_MIN_SPANS = 2048
+
+if njit is not None:
+    @njit(cache=True)
+    def _line_break_kernel(ybins):
+        """Single-pass break detection over sorted integer y buckets."""
+        breaks = np.empty(ybins.size, dtype=np.int64)
+        n = 0
+        for i in range(1, ybins.size):
+            if ybins[i] != ybins[i - 1]:
+                breaks[n] = i
+                n += 1
+        return breaks[:n]
+else:
+    _line_break_kernel = None
+
+
+def _find_line_breaks(ybins):
+    """Indices where a new line starts in a sorted y-bucket array."""
+    if _line_break_kernel is not None and ybins.size >= _NUMBA_MIN_SPANS:
+        return _line_break_kernel(ybins)
+    return np.nonzero(np.diff(ybins) != 0)[0] + 1
+
+# Labels the extraction rules key on; text far from all of them is noise
+# (terms & conditions, legal boilerplate) and only inflates token count
+_SECTION_ANCHORS = tuple(re.compile(p, re.I) for p in (
+    r"Policy\s*N(?:o|umber)",
+    r"Insured",
+    r"Premium",
+    r"Registration",
+    r"Engine\s*No",
+    r"Chassis",
+    r"Make",
+    r"Vehicle",
+    r"IDV",
+    r"[CSI]GST",
+    r"NCB",
+    r"Nominee",
+    r"Address",
+    r"Mobile",
+    r"Email",
+    r"Financier",
+    r"Period of Insurance",
+    r"RTO",
+))
+
+# Cap on PDF text characters injected into the prompt
+_MAX_PROMPT_TEXT = 12000
+
+
+def _condense_pdf_text(pdf_text: str, max_chars: int = _MAX_PROMPT_TEXT) -> str:
+    """Keep only text windows around the labels the prompt asks about."""
+    if len(pdf_text) <= max_chars:
+        return pdf_text
+
+    windows = []
+    for anchor in _SECTION_ANCHORS:
+        for m in anchor.finditer(pdf_text):
+            windows.append((max(0, m.start() - 400), min(len(pdf_text), m.end() + 800)))
+    if not windows:
+        return pdf_text[:max_chars]
+
+    # Merge overlapping windows so shared context is sent once
+    windows.sort()
+    merged = [windows[0]]
+    for start, end in windows[1:]:
+        if start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    parts = []
+    total = 0
+    for start, end in merged:
+        parts.append(pdf_text[start:end])
+        total += end - start
+        if total >= max_chars:
+            break
+    return "\n...\n".join(parts)
+
+
+def _response_cache_key(pdf_text: str, ic_name: str) -> str:
+    """Content-addressed cache key for a (pdf_text, ic_name) extraction."""
+    return hashlib.sha256((SCHEMA_VERSION + ic_name + pdf_text).encode()).hexdigest()
+
+
+def _read_cached_response(key: str) -> Dict:
+    """Return a previously cached extraction, or None if absent/corrupt."""
+    cache_file = _cache_dir / f"{key}.json"
+    if cache_file.exists():
+        try:
+            return json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            pass
+    return None
+
+
+def _write_cached_response(key: str, data: Dict):
+    """Persist a validated extraction; cache failures are non-fatal."""
+    try:
+        _cache_dir.mkdir(parents=True, exist_ok=True)
+        (_cache_dir / f"{key}.json").write_text(
+            json.dumps(data, ensure_ascii=False), encoding="utf-8"
+        )
+    except OSError:
+        pass
+
 # API Key Manager for multiple keys
 class APIKeyManager:
     """Manages multiple API keys with rotation"""
     def __init__(self):
         self.keys = []
-        self.current_index = 0
-        self.failed_keys = set()  # Track keys that hit rate limits
         self.key_stats = {}  # Track usage per key
-    
+        self.in_flight = collections.Counter()  # Active requests per key
+        self.failed_until = {}  # Failed keys rejoin once this time passes
+
     def add_keys(self, keys: list):
         """Add multiple API keys"""
         self.keys = [k.strip() for k in keys if k.strip()]
-        self.current_index = 0
-        self.failed_keys.clear()
+        self.in_flight.clear()
+        self.failed_until.clear()
         self.key_stats = {k: {"uses": 0, "failures": 0} for k in self.keys}
-    
+
+    def is_available(self, key: str) -> bool:
+        """Whether a key's failure TTL (if any) has expired"""
+        return self.failed_until.get(key, 0) < time.time()
+
+    def available_keys(self):
+        """Keys whose failure TTL has expired (keys self-rehabilitate)"""
+        return [key for key in self.keys if self.is_available(key)]
+
     def get_next_key(self):
-        """Get next available API key (round-robin)"""
+        """Get the available key with the fewest in-flight requests"""
         if not self.keys:
             return None
-        
-        # Try to find a key that hasn't failed
-        attempts = 0
-        while attempts < len(self.keys):
-            key = self.keys[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.keys)
-            
-            if key not in self.failed_keys:
-                return key
-            
-            attempts += 1
-        
-        # If all keys failed, reset and try again
-        if len(self.failed_keys) == len(self.keys):
-            self.failed_keys.clear()
-            return self.keys[0]
-        
-        return self.keys[0]
-    
+
+        candidates = self.available_keys()
+        if not candidates:
+            # Everything is cooling down; fall back to the least-loaded key
+            candidates = self.keys
+
+        return min(
+            candidates,
+            key=lambda k: (self.in_flight[k], self.key_stats.get(k, {}).get("uses", 0))
+        )
+
+    def acquire(self, key: str):
+        """Record that a request on this key is in flight"""
+        self.in_flight[key] += 1
+
+    def release(self, key: str):
+        """Record that a request on this key has finished"""
+        if self.in_flight[key] > 0:
+            self.in_flight[key] -= 1
+
     def mark_failed(self, key: str, reason: str = ""):
-        """Mark a key as failed (e.g., rate limit)"""
+        """Mark a key as failed with a TTL scaled to the failure type"""
         if "429" in reason or "RESOURCE_EXHAUSTED" in reason or "quota" in reason.lower():
-            self.failed_keys.add(key)
-            if key in self.key_stats:
-                self.key_stats[key]["failures"] += 1
-            return True
-        return False
+            ttl = 60  # Rate-limit windows roll off within a minute
+        elif "401" in reason or "API_KEY_INVALID" in reason or "PERMISSION_DENIED" in reason:
+            ttl = 3600  # Bad credentials will not fix themselves soon
+        else:
+            return False
+
+        self.failed_until[key] = time.time() + ttl
+        if key in self.key_stats:
+            self.key_stats[key]["failures"] += 1
+        return True
     
     def mark_success(self, key: str):
         """Mark a key as successfully used"""
@@ -87,11 +239,19 @@ class APIKeyManager:
 if 'api_key_manager' not in st.session_state:
     st.session_state.api_key_manager = APIKeyManager()
 
+# One client per key, created lazily and reused so HTTP connection
+# pools stay warm across retries and documents
+@functools.lru_cache(maxsize=32)
+def _client_for(api_key: str):
+    """Return the cached Gemini client for this API key."""
+    return genai.Client(api_key=api_key)
+
+
 # Initialize Gemini Client
 def get_gemini_client(api_key: str = None):
     """Get Gemini client with API key"""
     if api_key:
-        return genai.Client(api_key=api_key)
+        return _client_for(api_key)
     
     # Try to get from secrets
     try:
@@ -103,107 +263,145 @@ def get_gemini_client(api_key: str = None):
     if not api_key:
         api_key = os.getenv("GEMINI_API_KEY", "")
     
-    return genai.Client(api_key=api_key) if api_key else None
+    return _client_for(api_key) if api_key else None
 
 # Extract clean text from PDF
-def extract_clean_text(pdf_path: str) -> str:
-    """Extract text from PDF with better structure preservation."""
+@st.cache_data(show_spinner=False)
+def extract_clean_text_bytes(pdf_bytes: bytes) -> str:
+    """Extract text from PDF bytes with better structure preservation."""
     try:
-        doc = fitz.open(pdf_path)
-        text_lines = []
-        
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+        # Single structured extraction pass per page; both the block-level
+        # text and the positional fallback are derived from the same dict
+        page_dicts = [page.get_text("dict") for page in doc]
+        doc.close()
+
         # Method 1: Extract by blocks (preserves structure better)
-        for page_num, page in enumerate(doc):
-            blocks = page.get_text("blocks")
-            for block in blocks:
-                if len(block) >= 5:  # Valid text block
-                    text = block[4].strip()
-                    if text:
-                        text_lines.append(text)
-        
-        # Method 2: Fallback to word-based extraction if blocks are poor
-        if len(text_lines) < 10:  # If too few lines, use word-based
+        text_lines = []
+        for d in page_dicts:
+            for block in d["blocks"]:
+                lines = []
+                for line in block.get("lines", []):
+                    line_text = " ".join(
+                        span["text"] for span in line["spans"] if span["text"].strip()
+                    ).strip()
+                    if line_text:
+                        lines.append(line_text)
+                if lines:
+                    text_lines.append("\n".join(lines))
+
+        # Method 2: Fallback to position-based grouping if blocks are poor
+        if len(text_lines) < 10:  # If too few lines, regroup by coordinates
             text_lines = []
-            for page in doc:
-                words = page.get_text("words")
-                words.sort(key=lambda w: (round(w[1], 1), w[0]))
-                
-                line = []
-                last_y = None
-                for x0, y0, x1, y1, word, *_ in words:
-                    if last_y is None or abs(y0 - last_y) < 5:
-                        line.append(word)
-                    else:
-                        if line:
-                            text_lines.append(" ".join(line))
-                        line = [word]
-                    last_y = y0
-                if line:
-                    text_lines.append(" ".join(line))
-        
-        doc.close()
+            for d in page_dicts:
+                spans = [
+                    (span["bbox"][0], span["bbox"][1], span["text"])
+                    for block in d["blocks"]
+                    for line in block.get("lines", [])
+                    for span in line["spans"]
+                    if span["text"].strip()
+                ]
+                if not spans:
+                    continue
+
+                # Vectorized sort + line grouping (avoids a Python-level
+                # sort key and per-span loop on dense pages)
+                x0 = np.array([s[0] for s in spans], dtype=np.float32)
+                y0 = np.array([s[1] for s in spans], dtype=np.float32)
+                text_arr = np.array([s[2] for s in spans], dtype=object)
+
+                # Quantize y into 5-unit buckets: spans in the same bucket
+                # belong to one line, so grouping is a plain integer compare
+                ybins = (y0 // 5.0).astype(np.int32)
+                order = np.lexsort((x0, ybins))
+                ybins = ybins[order]
+
+                line_breaks = _find_line_breaks(ybins)
+                for group in np.split(text_arr[order], line_breaks):
+                    text_lines.append(" ".join(group))
         
         # Clean and preserve structure
         clean_text = "\n".join(text_lines)
-        clean_text = re.sub(r"[ \t]+", " ", clean_text)
-        clean_text = re.sub(r"\n{3,}", "\n\n", clean_text)
+        clean_text = _WS_RE.sub(" ", clean_text)
+        clean_text = _NL_RE.sub("\n\n", clean_text)
         return clean_text.strip()
     
     except Exception as e:
         st.error(f"Error extracting text from PDF: {e}")
         return ""
 
-# Create extraction prompt
-def create_extraction_prompt(pdf_text: str, ic_name: str) -> str:
-    """Create a detailed extraction prompt"""
-    
-    schema = {
-        "BROKER_NAME": "",
-        "CC": "",
-        "CGST": "",
-        "CHASIS_NUMBER": "",
-        "CITY_NAME": "",
-        "COVER": "",
-        "CUSTOMER_EMAIL": "",
-        "CUSTOMER_NAME": "",
-        "CV_TYPE": "",
-        "ENGINE_NUMBER": "",
-        "FINANCIER_NAME": "",
-        "FUEL_TYPE": "",
-        "GST": "",
-        "GVW": "",
-        "IDV_SUM_INSURED": "",
-        "IGST": "",
-        "INSURANCE_COMPANY_NAME": "",
-        "COMPLETE_LOCATION_ADDRESS": "",
-        "MOB_NO": "",
-        "NCB": "",
-        "NET_PREMIUM": "",
-        "NOMINEE_NAME": "",
-        "NOMINEE_RELATIONSHIP": "",
-        "OD_EXPIRE_DATE": "",
-        "OD_PREMIUM": "",
-        "PINCODE": "",
-        "POLICY_ISSUE_DATE": "",
-        "POLICY_NO": "",
-        "PRODUCT_CODE": "",
-        "REGISTRATION_DATE": "",
-        "REGISTRATION_NUMBER": "",
-        "RISK_END_DATE": "",
-        "RISK_START_DATE": "",
-        "SGST": "",
-        "STATE_NAME": "",
-        "TOTAL_PREMIUM": "",
-        "TP_ONLY_PREMIUM": "",
-        "VEHICLE_MAKE": "",
-        "VEHICLE_MODEL": "",
-        "VEHICLE_SUB_TYPE": "",
-        "VEHICLE_VARIANT": "",
-        "YEAR_OF_MANUFACTURE": ""
-    }
+# Cap on per-session memoized extractions (most recent kept)
+_PDF_TEXT_CACHE_MAX = 8
 
-    if ic_name.lower() == "reliance":
-        extraction_rules = """
+
+def _session_pdf_text(pdf_bytes: bytes) -> str:
+    """Memoize extracted text in session state, keyed by content hash.
+
+    Backs up st.cache_data with cross-rerun memory that survives cache
+    clears within the session; bounded to the most recent entries.
+    """
+    cache = st.session_state.setdefault("pdf_text_cache", collections.OrderedDict())
+    h = hashlib.sha1(pdf_bytes).digest()
+    if h in cache:
+        cache.move_to_end(h)
+        return cache[h]
+
+    text = extract_clean_text_bytes(pdf_bytes)
+    cache[h] = text
+    while len(cache) > _PDF_TEXT_CACHE_MAX:
+        cache.popitem(last=False)
+    return text
+
+# Target extraction schema, serialized once at import time
+_SCHEMA = {
+    "BROKER_NAME": "",
+    "CC": "",
+    "CGST": "",
+    "CHASIS_NUMBER": "",
+    "CITY_NAME": "",
+    "COVER": "",
+    "CUSTOMER_EMAIL": "",
+    "CUSTOMER_NAME": "",
+    "CV_TYPE": "",
+    "ENGINE_NUMBER": "",
+    "FINANCIER_NAME": "",
+    "FUEL_TYPE": "",
+    "GST": "",
+    "GVW": "",
+    "IDV_SUM_INSURED": "",
+    "IGST": "",
+    "INSURANCE_COMPANY_NAME": "",
+    "COMPLETE_LOCATION_ADDRESS": "",
+    "MOB_NO": "",
+    "NCB": "",
+    "NET_PREMIUM": "",
+    "NOMINEE_NAME": "",
+    "NOMINEE_RELATIONSHIP": "",
+    "OD_EXPIRE_DATE": "",
+    "OD_PREMIUM": "",
+    "PINCODE": "",
+    "POLICY_ISSUE_DATE": "",
+    "POLICY_NO": "",
+    "PRODUCT_CODE": "",
+    "REGISTRATION_DATE": "",
+    "REGISTRATION_NUMBER": "",
+    "RISK_END_DATE": "",
+    "RISK_START_DATE": "",
+    "SGST": "",
+    "STATE_NAME": "",
+    "TOTAL_PREMIUM": "",
+    "TP_ONLY_PREMIUM": "",
+    "VEHICLE_MAKE": "",
+    "VEHICLE_MODEL": "",
+    "VEHICLE_SUB_TYPE": "",
+    "VEHICLE_VARIANT": "",
+    "YEAR_OF_MANUFACTURE": ""
+}
+_SCHEMA_JSON_STR = json.dumps(_SCHEMA, indent=2)
+_REQUIRED_FIELDS = tuple(_SCHEMA.keys())
+
+_RULES_RELIANCE = """
 CRITICAL EXTRACTION RULES FOR RELIANCE GENERAL INSURANCE:
 
 1. POLICY_NO: Look for "Policy Number" or "Policy No" - Extract the exact alphanumeric value
@@ -255,8 +453,8 @@ IMPORTANT:
 - If a field is not found, return empty string ""
 - Do NOT add any text that is not in the PDF
 """
-    else:  # Shriram
-        extraction_rules = """
+
+_RULES_SHRIRAM = """
 CRITICAL EXTRACTION RULES FOR SHRIRAM GENERAL INSURANCE:
 
 1. POLICY_NO: Look for "Policy No." - Extract the exact alphanumeric value
@@ -309,6 +507,14 @@ IMPORTANT:
 - Do NOT add any text that is not in the PDF
 """
 
+
+# Create extraction prompt
+@st.cache_data(show_spinner=False)
+def create_extraction_prompt(pdf_text: str, ic_name: str) -> str:
+    """Create a detailed extraction prompt"""
+
+    extraction_rules = _RULES_RELIANCE if ic_name.lower() == "reliance" else _RULES_SHRIRAM
+
     prompt = f"""You are an expert at extracting structured data from insurance policy documents.
 
 {extraction_rules}
@@ -318,16 +524,163 @@ Extract all fields from the PDF text below and return ONLY a valid JSON object w
 Do NOT include any explanations, markdown formatting, or additional text - ONLY the JSON object.
 
 REQUIRED OUTPUT FORMAT:
-{json.dumps(schema, indent=2)}
+{_SCHEMA_JSON_STR}
 
 PDF TEXT TO EXTRACT FROM:
 {pdf_text}
 
 Return ONLY the JSON object with all extracted fields. Ensure all string values are properly quoted and escaped.
 """
-    
+
     return prompt
 
+def _stream_json_text(stream_client, prompt: str) -> str:
+    """Stream the model response, stopping once the JSON object closes.
+
+    Brace depth is tracked per chunk so the call returns (and the stream
+    is abandoned) as soon as the top-level object is balanced, instead of
+    waiting for the model to finish any trailing output.
+    """
+    buf = []
+    depth = 0
+    seen_open = False
+    for chunk in stream_client.models.generate_content_stream(
+        model="gemini-2.5-flash",
+        contents=prompt
+    ):
+        chunk_text = chunk.text or ""
+        buf.append(chunk_text)
+        for ch in chunk_text:
+            if ch == "{":
+                depth += 1
+                seen_open = True
+            elif ch == "}":
+                depth -= 1
+        if seen_open and depth <= 0:
+            break
+    return "".join(buf)
+
+
+# Worker for parallel extraction: one request on one key
+def _generate_text(api_key: str, prompt: str) -> str:
+    """Issue a single streamed generation on its own client (thread-safe)."""
+    return _stream_json_text(_client_for(api_key), prompt)
+
+
+def _tracked_generate(manager, api_key: str, prompt: str) -> str:
+    """Run _generate_text with in-flight accounting on the key manager."""
+    manager.acquire(api_key)
+    try:
+        return _generate_text(api_key, prompt)
+    finally:
+        manager.release(api_key)
+
+
+# Parallel extraction: race all available keys, first valid JSON wins
+def _extract_json_parallel(prompt: str, ic_name: str, manager, cache_key: str) -> Dict:
+    """Fan out one request per available key; return the first valid result."""
+    active_keys = manager.available_keys()
+    if not active_keys:
+        active_keys = manager.keys
+
+    pool = ThreadPoolExecutor(max_workers=len(active_keys))
+    try:
+        with st.spinner(f"Extracting data ({len(active_keys)} keys in parallel)..."):
+            futures = {pool.submit(_tracked_generate, manager, key, prompt): key for key in active_keys}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures[future]
+                    try:
+                        text = future.result()
+                        start = text.find("{")
+                        end = text.rfind("}") + 1
+                        if start == -1 or end == 0:
+                            raise ValueError("No JSON object found in response")
+                        data = orjson.loads(text[start:end])
+                    except Exception as e:
+                        manager.mark_failed(key, str(e))
+                        continue
+
+                    # First valid response wins; drop the rest
+                    for f in pending:
+                        f.cancel()
+
+                    data = validate_and_clean_data(data, ic_name)
+                    manager.mark_success(key)
+                    _write_cached_response(cache_key, data)
+                    return data
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    st.error("All API keys failed to produce a valid response. Please retry or add more keys.")
+    return {}
+
+
+# Batch extraction: one worker thread per key drains a shared job queue
+def _batch_worker(jobs, results: Dict, manager, api_key: str):
+    """Pull extraction jobs and run each on this worker's dedicated key."""
+    while True:
+        try:
+            name, prompt, ic_name, cache_key, attempts = jobs.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            text = _tracked_generate(manager, api_key, prompt)
+            start = text.find("{")
+            end = text.rfind("}") + 1
+            if start == -1 or end == 0:
+                raise ValueError("No JSON object found in response")
+            data = validate_and_clean_data(orjson.loads(text[start:end]), ic_name)
+        except Exception as e:
+            manager.mark_failed(api_key, str(e))
+            if attempts + 1 < MAX_RETRIES:
+                # Requeue so another key (or a later retry) can pick it up
+                jobs.put((name, prompt, ic_name, cache_key, attempts + 1))
+            else:
+                results[name] = {}
+        else:
+            manager.mark_success(api_key)
+            _write_cached_response(cache_key, data)
+            results[name] = data
+        finally:
+            jobs.task_done()
+
+
+def _extract_json_batch(docs, ic_name: str, manager) -> Dict:
+    """Extract several documents in parallel, one worker thread per key.
+
+    docs is a list of (filename, pdf_text) pairs; returns a dict keyed by
+    filename. Cache hits are resolved up front without occupying a worker.
+    """
+    results = {}
+    jobs = queue.Queue()
+    for name, pdf_text in docs:
+        cache_key = _response_cache_key(pdf_text, ic_name)
+        cached = _read_cached_response(cache_key)
+        if cached is not None:
+            results[name] = cached
+            continue
+        prompt = create_extraction_prompt(_condense_pdf_text(pdf_text), ic_name)
+        jobs.put((name, prompt, ic_name, cache_key, 0))
+
+    if not jobs.empty():
+        workers = [
+            threading.Thread(
+                target=_batch_worker,
+                args=(jobs, results, manager, key),
+                daemon=True
+            )
+            for key in (manager.available_keys() or manager.keys)
+        ]
+        for worker in workers:
+            worker.start()
+        jobs.join()
+
+    return results
+
+
 # Extract JSON with retry logic and multiple API keys
 def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_manager=False) -> Dict:
     """Extract structured JSON using Gemini with retry logic and multiple API key support"""
@@ -336,9 +689,21 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
         st.warning("PDF text is too short or empty")
         return {}
     
-    prompt = create_extraction_prompt(pdf_text, ic_name)
+    # Serve identical (pdf_text, ic_name) requests from the disk cache
+    # without touching the API
+    cache_key = _response_cache_key(pdf_text, ic_name)
+    cached = _read_cached_response(cache_key)
+    if cached is not None:
+        st.info("Loaded result from cache (no API call needed)")
+        return cached
+
+    prompt = create_extraction_prompt(_condense_pdf_text(pdf_text), ic_name)
     manager = st.session_state.api_key_manager if use_key_manager else None
-    
+
+    # With several keys, race them in parallel instead of serial rotation
+    if manager and len(manager.keys) > 1:
+        return _extract_json_parallel(prompt, ic_name, manager, cache_key)
+
     # Try with multiple keys if manager is available
     max_key_attempts = len(manager.keys) if manager and manager.keys else 1
     
@@ -349,7 +714,7 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
             if not api_key:
                 st.error("No available API keys. All keys have hit rate limits.")
                 return {}
-            current_client = genai.Client(api_key=api_key)
+            current_client = _client_for(api_key)
             st.info(f"Using API key {key_attempt + 1}/{max_key_attempts}")
         elif client:
             current_client = client
@@ -362,14 +727,16 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
         for attempt in range(MAX_RETRIES):
             try:
                 with st.spinner(f"Extracting data (key {key_attempt + 1}, attempt {attempt + 1}/{MAX_RETRIES})..."):
-                    response = current_client.models.generate_content(
-                        model="gemini-2.5-flash",
-                        contents=prompt
-                    )
-                
-                text = response.text.strip()
-                
-                # Find JSON in response
+                    if manager:
+                        manager.acquire(api_key)
+                    try:
+                        text = _stream_json_text(current_client, prompt)
+                    finally:
+                        if manager:
+                            manager.release(api_key)
+
+                # Find JSON in response (no .strip() needed; the slice
+                # bounds the object and orjson tolerates whitespace)
                 start = text.find("{")
                 end = text.rfind("}") + 1
                 
@@ -377,7 +744,7 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
                     raise ValueError("No JSON object found in response")
                 
                 json_text = text[start:end]
-                data = json.loads(json_text)
+                data = orjson.loads(json_text)
                 
                 # Validate and clean data
                 data = validate_and_clean_data(data, ic_name)
@@ -385,7 +752,8 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
                 # Mark success
                 if manager and api_key:
                     manager.mark_success(api_key)
-                
+
+                _write_cached_response(cache_key, data)
                 return data
                 
             except json.JSONDecodeError as e:
@@ -431,30 +799,24 @@ def extract_json_with_gemini(pdf_text: str, ic_name: str, client=None, use_key_m
 def validate_and_clean_data(data: Dict, ic_name: str) -> Dict:
     """Validate and clean extracted data"""
     
-    required_fields = [
-        "BROKER_NAME", "CC", "CGST", "CHASIS_NUMBER", "CITY_NAME", "COVER",
-        "CUSTOMER_EMAIL", "CUSTOMER_NAME", "CV_TYPE", "ENGINE_NUMBER",
-        "FINANCIER_NAME", "FUEL_TYPE", "GST", "GVW", "IDV_SUM_INSURED",
-        "IGST", "INSURANCE_COMPANY_NAME", "COMPLETE_LOCATION_ADDRESS",
-        "MOB_NO", "NCB", "NET_PREMIUM", "NOMINEE_NAME", "NOMINEE_RELATIONSHIP",
-        "OD_EXPIRE_DATE", "OD_PREMIUM", "PINCODE", "POLICY_ISSUE_DATE",
-        "POLICY_NO", "PRODUCT_CODE", "REGISTRATION_DATE", "REGISTRATION_NUMBER",
-        "RISK_END_DATE", "RISK_START_DATE", "SGST", "STATE_NAME",
-        "TOTAL_PREMIUM", "TP_ONLY_PREMIUM", "VEHICLE_MAKE", "VEHICLE_MODEL",
-        "VEHICLE_SUB_TYPE", "VEHICLE_VARIANT", "YEAR_OF_MANUFACTURE"
-    ]
-    
-    # Initialize missing fields
-    for field in required_fields:
-        if field not in data:
-            data[field] = ""
-    
-    # Clean string values
+    # Start from a fresh schema template: one dict build fills missing
+    # fields and drops any keys the model invented
+    out = dict.fromkeys(_REQUIRED_FIELDS, "")
+    out.update((k, v) for k, v in data.items() if k in _SCHEMA)
+    data = out
+
+
+    # Clean string values in one pass per field
     for key, value in data.items():
         if isinstance(value, str):
-            data[key] = " ".join(value.split())
-            if value.lower() in ["none", "null", "n/a", "na"]:
+            v = value.strip()
+            if v.lower() in _NULL_VALUES:
                 data[key] = ""
+                continue
+            # Only re-split when internal whitespace actually needs collapsing
+            if "  " in v or "\t" in v or "\n" in v:
+                v = " ".join(v.split())
+            data[key] = v
     
     # Validate insurance company name
     if ic_name.lower() == "reliance":
@@ -479,32 +841,37 @@ def main():
         st.subheader("🔑 API Keys")
         st.markdown("**Enter multiple API keys (one per line) to avoid rate limits**")
         
-        api_keys_text = st.text_area(
-            "Gemini API Keys",
-            height=150,
-            help="Enter multiple API keys, one per line. The app will automatically rotate between them when rate limits are hit.",
-            placeholder="Enter your API keys here, one per line:\nkey1_here\nkey2_here\nkey3_here"
-        )
-        
-        # Single API Key (backward compatibility)
-        api_key_input = st.text_input(
-            "Or Single API Key (optional)",
-            type="password",
-            help="Alternative: Enter a single API key here"
-        )
-        
-        # Process API keys
-        if api_keys_text:
-            keys_list = [k.strip() for k in api_keys_text.split('\n') if k.strip()]
-            if keys_list:
-                st.session_state.api_key_manager.add_keys(keys_list)
-                st.success(f"✅ {len(keys_list)} API key(s) configured!")
-                st.caption(f"Keys will rotate automatically when rate limits are hit")
-        
-        if api_key_input:
-            os.environ["GEMINI_API_KEY"] = api_key_input
-            st.session_state.api_key_manager.add_keys([api_key_input])
-            st.success("Single API Key set!")
+        # Form batches key entry into one rerun instead of one per keystroke
+        with st.form("config"):
+            api_keys_text = st.text_area(
+                "Gemini API Keys",
+                height=150,
+                help="Enter multiple API keys, one per line. The app will automatically rotate between them when rate limits are hit.",
+                placeholder="Enter your API keys here, one per line:\nkey1_here\nkey2_here\nkey3_here"
+            )
+
+            # Single API Key (backward compatibility)
+            api_key_input = st.text_input(
+                "Or Single API Key (optional)",
+                type="password",
+                help="Alternative: Enter a single API key here"
+            )
+
+            config_submitted = st.form_submit_button("Apply Keys", use_container_width=True)
+
+        # Process API keys only when the form is submitted
+        if config_submitted:
+            if api_keys_text:
+                keys_list = [k.strip() for k in api_keys_text.split('\n') if k.strip()]
+                if keys_list:
+                    st.session_state.api_key_manager.add_keys(keys_list)
+                    st.success(f"✅ {len(keys_list)} API key(s) configured!")
+                    st.caption(f"Keys will rotate automatically when rate limits are hit")
+
+            if api_key_input:
+                os.environ["GEMINI_API_KEY"] = api_key_input
+                st.session_state.api_key_manager.add_keys([api_key_input])
+                st.success("Single API Key set!")
         
         # Show key statistics
         if st.session_state.api_key_manager.keys:
@@ -512,7 +879,7 @@ def main():
                 stats = st.session_state.api_key_manager.get_stats()
                 for idx, (key, stat) in enumerate(stats.items(), 1):
                     key_display = f"Key {idx}: {key[:10]}...{key[-4:]}" if len(key) > 14 else f"Key {idx}"
-                    status = "❌ Rate Limited" if key in st.session_state.api_key_manager.failed_keys else "✅ Active"
+                    status = "✅ Active" if st.session_state.api_key_manager.is_available(key) else "❌ Cooling Down"
                     st.write(f"{key_display} - {status}")
                     st.caption(f"  Uses: {stat['uses']} | Failures: {stat['failures']}")
         
@@ -539,27 +906,32 @@ def main():
         st.markdown("- Reliance General Insurance")
         st.markdown("- Shriram General Insurance")
     
-    # Main content area
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        ic_name = st.selectbox(
-            "Select Insurance Company",
-            ["reliance", "shriram"],
-            help="Choose the insurance company that issued the policy"
-        )
-    
-    with col2:
-        uploaded_file = st.file_uploader(
-            "Upload PDF File",
-            type=["pdf"],
-            help="Upload an insurance policy PDF file"
-        )
-    
+    # Main content area; the form defers the rerun until Extract is clicked,
+    # so dropping a file or switching company does not re-run the script
+    with st.form("extract"):
+        col1, col2 = st.columns([1, 1])
+
+        with col1:
+            ic_name = st.selectbox(
+                "Select Insurance Company",
+                ["reliance", "shriram"],
+                help="Choose the insurance company that issued the policy"
+            )
+
+        with col2:
+            uploaded_files = st.file_uploader(
+                "Upload PDF Files",
+                type=["pdf"],
+                accept_multiple_files=True,
+                help="Upload one or more insurance policy PDF files; with multiple API keys they are processed in parallel"
+            )
+
+        extract_clicked = st.form_submit_button("🚀 Extract Data", type="primary", use_container_width=True)
+
     # Process button
-    if st.button("🚀 Extract Data", type="primary", use_container_width=True):
-        if not uploaded_file:
-            st.error("Please upload a PDF file first")
+    if extract_clicked:
+        if not uploaded_files:
+            st.error("Please upload at least one PDF file first")
             return
         
         # Check if we have API keys
@@ -572,84 +944,125 @@ def main():
         use_key_manager = bool(api_keys_text and len([k for k in api_keys_text.split('\n') if k.strip()]) > 1)
         
         st.session_state.processing = True
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.read())
-            tmp_path = tmp_file.name
-        
+        manager = st.session_state.api_key_manager
+
         try:
-            # Extract text
-            with st.spinner("Extracting text from PDF..."):
-                pdf_text = extract_clean_text(tmp_path)
-            
-            if not pdf_text:
-                st.error("Failed to extract text from PDF. Please check if the file is valid.")
+            # Extract text from every upload first (cached per file content)
+            docs = []
+            with st.spinner("Extracting text from PDFs..."):
+                for uploaded_file in uploaded_files:
+                    pdf_text = _session_pdf_text(uploaded_file.getvalue())
+                    if pdf_text:
+                        docs.append((uploaded_file.name, pdf_text))
+                    else:
+                        st.error(f"Failed to extract text from {uploaded_file.name}. Please check if the file is valid.")
+
+            if not docs:
                 return
-            
+
             # Show extracted text preview
             with st.expander("📝 View Extracted Text (Preview)", expanded=False):
-                st.text_area("PDF Text", pdf_text[:2000] + "..." if len(pdf_text) > 2000 else pdf_text, height=200)
-            
-            # Get Gemini client (for single key mode)
-            client = None
-            if not use_key_manager:
-                client = get_gemini_client(api_key_input if api_key_input else None)
-            
-            # Extract structured data
-            structured_data = extract_json_with_gemini(pdf_text, ic_name, client, use_key_manager=use_key_manager)
-            
-            if structured_data:
-                st.session_state.results = structured_data
-                st.success("✅ Data extracted successfully!")
+                for name, pdf_text in docs:
+                    st.text_area(name, pdf_text[:2000] + "..." if len(pdf_text) > 2000 else pdf_text, height=200, key=f"preview_{name}")
+
+            if len(docs) > 1 and use_key_manager:
+                # Batch mode: one worker thread per key drains the queue
+                with st.spinner(f"Extracting {len(docs)} documents across {len(manager.keys)} keys..."):
+                    results = _extract_json_batch(docs, ic_name, manager)
+            else:
+                # Get Gemini client (for single key mode)
+                client = None
+                if not use_key_manager:
+                    client = get_gemini_client(api_key_input if api_key_input else None)
+
+                results = {}
+                for name, pdf_text in docs:
+                    results[name] = extract_json_with_gemini(pdf_text, ic_name, client, use_key_manager=use_key_manager)
+
+            succeeded = sum(1 for data in results.values() if data)
+            if succeeded:
+                st.session_state.results = results
+                st.success(f"✅ Extracted {succeeded}/{len(docs)} document(s) successfully!")
             else:
                 st.error("Failed to extract data. Please try again.")
-        
+
         except Exception as e:
             st.error(f"An error occurred: {e}")
-        
+
         finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
             st.session_state.processing = False
     
-    # Display results
+    # Display results (dict keyed by filename)
     if st.session_state.results:
         st.markdown("---")
         st.header("📊 Extracted Data")
-        
-        # Key information cards
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric("Policy Number", st.session_state.results.get("POLICY_NO", "N/A"))
-        
-        with col2:
-            st.metric("Customer Name", st.session_state.results.get("CUSTOMER_NAME", "N/A")[:30] + "..." if len(st.session_state.results.get("CUSTOMER_NAME", "")) > 30 else st.session_state.results.get("CUSTOMER_NAME", "N/A"))
-        
-        with col3:
-            st.metric("Total Premium", st.session_state.results.get("TOTAL_PREMIUM", "N/A"))
-        
-        with col4:
-            st.metric("Vehicle", f"{st.session_state.results.get('VEHICLE_MAKE', '')} {st.session_state.results.get('VEHICLE_MODEL', '')}")
-        
-        # Detailed results
-        st.subheader("Complete Data")
-        
-        # Display as JSON
-        st.json(st.session_state.results)
-        
-        # Download button
-        json_str = json.dumps(st.session_state.results, indent=2, ensure_ascii=False)
-        st.download_button(
-            label="📥 Download JSON",
-            data=json_str,
-            file_name=f"extracted_{st.session_state.results.get('POLICY_NO', 'data')}.json",
-            mime="application/json",
-            use_container_width=True
-        )
-        
+
+        results = st.session_state.results
+
+        if len(results) == 1:
+            (filename, data), = results.items()
+
+            # Key information cards
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                st.metric("Policy Number", data.get("POLICY_NO", "N/A"))
+
+            with col2:
+                st.metric("Customer Name", data.get("CUSTOMER_NAME", "N/A")[:30] + "..." if len(data.get("CUSTOMER_NAME", "")) > 30 else data.get("CUSTOMER_NAME", "N/A"))
+
+            with col3:
+                st.metric("Total Premium", data.get("TOTAL_PREMIUM", "N/A"))
+
+            with col4:
+                st.metric("Vehicle", f"{data.get('VEHICLE_MAKE', '')} {data.get('VEHICLE_MODEL', '')}")
+
+            # Detailed results
+            st.subheader("Complete Data")
+
+            # Display as JSON
+            st.json(data)
+
+            # Download button
+            json_str = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+            st.download_button(
+                label="📥 Download JSON",
+                data=json_str,
+                file_name=f"extracted_{data.get('POLICY_NO', 'data')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        else:
+            # Summary table across all extractions
+            st.dataframe(
+                [
+                    {
+                        "File": filename,
+                        "Policy Number": data.get("POLICY_NO", ""),
+                        "Customer Name": data.get("CUSTOMER_NAME", ""),
+                        "Total Premium": data.get("TOTAL_PREMIUM", ""),
+                        "Vehicle": f"{data.get('VEHICLE_MAKE', '')} {data.get('VEHICLE_MODEL', '')}".strip(),
+                        "Status": "✅" if data else "❌"
+                    }
+                    for filename, data in results.items()
+                ],
+                use_container_width=True
+            )
+
+            for filename, data in results.items():
+                with st.expander(f"📄 {filename}", expanded=False):
+                    st.json(data)
+
+            # Single download containing every extraction
+            json_str = orjson.dumps(results, option=orjson.OPT_INDENT_2).decode()
+            st.download_button(
+                label="📥 Download All JSON",
+                data=json_str,
+                file_name="extracted_batch.json",
+                mime="application/json",
+                use_container_width=True
+            )
+
         # Clear results button
         if st.button("🔄 Process Another File", use_container_width=True):
             st.session_state.results = None